@@ -1,146 +1,184 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Dict
+import asyncio
+import hashlib
+import logging
+import traceback
+from operator import itemgetter
+from collections import defaultdict
+from dataclasses import dataclass, field
+import orjson
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from typing import List, Dict, Iterator, Optional, Set, Tuple
 from pydantic import BaseModel
-from ..elvanto_client import ElvantoClient
+from cachetools import TTLCache
+from ..elvanto_client import ElvantoClient, should_include_person, unwrap
 
-router = APIRouter(prefix="/api", tags=["people"])
+logger = logging.getLogger(__name__)
+
+# These endpoints return thousands of records, so serialize with orjson
+router = APIRouter(prefix="/api", tags=["people"], default_response_class=ORJSONResponse)
 
 class BaseRequest(BaseModel):
+    model_config = {"frozen": True}
+    
     api_key: str
 
+# Id collections are sets: JSON arrays are coerced and deduplicated, and
+# membership tests while filtering are O(1)
 class FilterRequest(BaseRequest):
-    group_ids: List[str] = []
-    service_position_ids: List[str] = []
-    excluded_category_ids: List[str] = []
-    excluded_group_category_ids: List[str] = []
+    group_ids: Set[str] = set()
+    service_position_ids: Set[str] = set()
+    excluded_category_ids: Set[str] = set()
+    excluded_group_category_ids: Set[str] = set()
 
 class GroupsAndServicesRequest(BaseRequest):
-    excluded_group_category_ids: List[str] = []
+    excluded_group_category_ids: Set[str] = set()
 
 class CategoriesRequest(BaseRequest):
     pass
 
-def _is_adult(person: Dict) -> bool:
+@dataclass(slots=True)
+class PersonOut:
+    """A person in the /filter result; orjson serializes it directly"""
+    id: str
+    firstname: str
+    preferred_name: str
+    lastname: str
+    email: str
+    groups: List[Dict] = field(default_factory=list)
+    service_positions: List[Dict] = field(default_factory=list)
+    
+    @classmethod
+    def from_person(cls, person: Dict) -> "PersonOut":
+        return cls(
+            id=person.get("id"),
+            firstname=person.get("firstname", ""),
+            preferred_name=person.get("preferred_name", ""),
+            lastname=person.get("lastname", ""),
+            email=person.get("email", "")
+        )
+
+# Categories and group lists change rarely, so keep recent responses per API key
+_response_cache = TTLCache(maxsize=512, ttl=300)
+_response_cache_lock = asyncio.Lock()
+
+def _api_key_hash(api_key: str) -> str:
+    """Hash the API key so raw keys are never held as cache keys"""
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+def _cache_key(endpoint: str, api_key: str) -> tuple:
+    return (endpoint, _api_key_hash(api_key))
+
+async def _cache_get(key: tuple) -> Optional[Dict]:
+    async with _response_cache_lock:
+        return _response_cache.get(key)
+
+async def _cache_set(key: tuple, value: Dict) -> Dict:
+    async with _response_cache_lock:
+        return _response_cache.setdefault(key, value)
+
+def _tagged(payload: Dict) -> Tuple[Dict, str]:
+    """Pair a payload with its ETag, hashed once when it's cached rather than on every hit"""
+    return payload, '"%s"' % hashlib.blake2b(orjson.dumps(payload), digest_size=16).hexdigest()
+
+def _etag_response(tagged: Tuple[Dict, Optional[str]], http_request: Request, response: Response):
     """
-    Check if a person should be included as an adult.
-    - Include if demographics has 'Adults'
-    - Include if no demographics are set (assume adult)
-    - Exclude only if explicitly marked as 'Children' (and not also 'Adults')
+    Send a (payload, etag) pair with its ETag, or an empty 304 if the client sent it
+    back in If-None-Match. Uncached payloads have no ETag and are sent as-is.
     """
-    demographics = person.get("demographics", {})
-    if not demographics or not isinstance(demographics, dict):
-        return True
-    
-    demo_list = demographics.get("demographic", [])
-    if isinstance(demo_list, dict):
-        demo_list = [demo_list]
-    
-    if not demo_list:
-        return True
-    
-    demo_names = [d.get("name", "").lower() for d in demo_list]
-    
-    if "adults" in demo_names:
-        return True
-    
-    if "children" in demo_names:
-        return False
-    
-    return True
+    payload, etag = tagged
+    if etag is None:
+        return payload
+    if http_request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return payload
 
-def should_include_person(person: Dict, excluded_category_ids: List[str] = None) -> bool:
-    """Check if a person should be included based on all criteria"""
-    if excluded_category_ids is None:
-        excluded_category_ids = []
-    
-    # Exclude archived people
-    archived = person.get("archived", 0)
-    if archived == 1 or archived == "1" or str(archived).lower() == "true":
-        return False
-    
-    # Exclude people in excluded categories
-    category_id = person.get("category_id", "")
-    if category_id in excluded_category_ids:
-        return False
-    
-    # Check demographics - exclude children
-    if not _is_adult(person):
-        return False
-    
-    return True
+def _group_categories(group: Dict) -> List[Dict]:
+    """A group's categories, keeping only entries that carry an id"""
+    return [
+        cat for cat in unwrap(group, "categories", "category")
+        if isinstance(cat, dict) and cat.get("id")
+    ]
+
+def _group_category_ids(group: Dict) -> List[str]:
+    """A group's category ids, memoized on the group dict since cached groups are re-checked per filter"""
+    cat_ids = group.get("_cat_ids")
+    if cat_ids is None:
+        cat_ids = group["_cat_ids"] = [cat["id"] for cat in _group_categories(group)]
+    return cat_ids
 
 def get_leaders_from_group(group: Dict) -> List[Dict]:
     """Extract only leaders from a group's people list"""
-    people_data = group.get("people", {})
-    if not people_data:
-        return []
-    
-    persons = people_data.get("person", [])
-    if isinstance(persons, dict):
-        persons = [persons]
-    
+    persons = unwrap(group, "people", "person")
     leaders = [p for p in persons if p.get("position", "").lower() == "leader"]
     return leaders
 
-def get_person_positions_from_departments(person: Dict) -> List[Dict]:
-    """Extract all volunteer position names from a person's departments"""
-    positions = []
-    
-    depts = person.get("departments", {})
-    if not depts or not isinstance(depts, dict):
-        return positions
-    
-    dept_list = depts.get("department", [])
-    if isinstance(dept_list, dict):
-        dept_list = [dept_list]
-    
-    for dept in dept_list:
+def iter_person_position_ids(person: Dict, wanted: Optional[Set[str]] = None) -> Iterator[Tuple[str, str]]:
+    """
+    Yield (position id, department name) for the volunteer positions in a person's
+    departments, limited to the ids in `wanted` when given. Position ids are
+    sub-department names, matching the collapsed format from
+    extract_volunteer_positions_from_people.
+    """
+    for dept in unwrap(person, "departments", "department"):
         dept_name = dept.get("name", "Unknown")
         
-        sub_depts = dept.get("sub_departments", {})
-        if not sub_depts or not isinstance(sub_depts, dict):
-            continue
-        
-        sub_list = sub_depts.get("sub_department", [])
-        if isinstance(sub_list, dict):
-            sub_list = [sub_list]
-        
-        for sub in sub_list:
+        for sub in unwrap(dept, "sub_departments", "sub_department"):
             sub_name = sub.get("name", "")
             
-            # Skip if no sub-department name
-            if not sub_name:
-                continue
-            
-            positions_data = sub.get("positions", {})
-            if not positions_data or not isinstance(positions_data, dict):
+            # Skip if no sub-department name or it wasn't asked for
+            if not sub_name or (wanted is not None and sub_name not in wanted):
                 continue
             
-            pos_list = positions_data.get("position", [])
-            if isinstance(pos_list, dict):
-                pos_list = [pos_list]
-            
-            for pos in pos_list:
-                # Use sub-department name as the position name
-                # This matches the collapsed format from extract_volunteer_positions_from_people
-                display_name = sub_name
-                
-                positions.append({
-                    "id": display_name,
-                    "name": display_name,
-                    "department": dept_name
-                })
-    
-    return positions
+            if unwrap(sub, "positions", "position"):
+                yield sub_name, dept_name
+
+# (person order, position order, person, position id, department name)
+PositionEntry = Tuple[int, int, Dict, str, str]
+
+def build_position_index(people: List[Dict], wanted: Optional[Set[str]] = None) -> Dict[str, List[PositionEntry]]:
+    """
+    Invert people's departments into position id -> [PositionEntry, ...] so a
+    filter only touches the people rostered on the requested positions. Each
+    person appears once per position; the order fields let matches from several
+    positions be put back into Elvanto's person and department order.
+    Pass `wanted` to skip indexing positions nobody asked for.
+    """
+    index = defaultdict(list)
+    for person_order, person in enumerate(people):
+        if not person.get("id"):
+            continue
+        
+        seen_position_ids = set()
+        for position_order, (position_id, dept_name) in enumerate(iter_person_position_ids(person, wanted)):
+            if position_id not in seen_position_ids:
+                seen_position_ids.add(position_id)
+                index[position_id].append((person_order, position_order, person, position_id, dept_name))
+    return dict(index)
+
+async def _empty_result() -> List:
+    """Placeholder for a fetch the current request doesn't need"""
+    return []
 
 @router.post("/categories")
-async def get_categories(request: CategoriesRequest):
+async def get_categories(request: CategoriesRequest, http_request: Request, response: Response):
     """Get all people categories for exclusion selection"""
     try:
-        client = ElvantoClient(api_key=request.api_key)
-        categories = client.get_all_categories()
+        cache_key = _cache_key("categories", request.api_key)
+        cached = await _cache_get(cache_key)
+        if cached is not None:
+            return _etag_response(cached, http_request, response)
         
-        return {
+        try:
+            with ElvantoClient(api_key=request.api_key) as client:
+                categories = await asyncio.to_thread(client.get_all_categories)
+        except Exception as e:
+            # Still answer with no categories, but leave it uncached so the next load retries
+            logger.error("Error fetching categories: %s", e)
+            return {"categories": []}
+        
+        tagged = await _cache_set(cache_key, _tagged({
             "categories": [
                 {
                     "id": cat.get("id", ""),
@@ -148,49 +186,38 @@ async def get_categories(request: CategoriesRequest):
                 }
                 for cat in categories
             ]
-        }
+        }))
+        return _etag_response(tagged, http_request, response)
     except Exception as e:
-        import traceback
-        print(f"Error fetching categories: {traceback.format_exc()}")
+        logger.error("Error fetching categories: %s", traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/group-categories")
-async def get_group_categories(request: CategoriesRequest):
+async def get_group_categories(request: CategoriesRequest, http_request: Request, response: Response):
     """Get all group categories extracted from groups, plus a 'no category' option"""
     try:
-        client = ElvantoClient(api_key=request.api_key)
+        cache_key = _cache_key("group-categories", request.api_key)
+        cached = await _cache_get(cache_key)
+        if cached is not None:
+            return _etag_response(cached, http_request, response)
         
-        # Fetch groups with categories field
-        groups = client.get_all_groups_with_categories()
+        # Same fetch as groups-and-services, so the client's cache can serve both
+        with ElvantoClient(api_key=request.api_key) as client:
+            groups = await asyncio.to_thread(client.get_all_groups)
         
         # Extract unique categories from groups
         categories_dict = {}
         groups_without_category = 0
         
         for group in groups:
-            categories = group.get("categories")
-            if categories:
-                # Handle dict structure: {"category": [...]}
-                if isinstance(categories, dict):
-                    cat_list = categories.get("category", [])
-                    if isinstance(cat_list, dict):
-                        cat_list = [cat_list]
-                elif isinstance(categories, list):
-                    cat_list = categories
-                elif isinstance(categories, str):
-                    # If it's a string, we can't extract id/name, skip
-                    continue
-                else:
-                    cat_list = []
-                
-                for cat in cat_list:
-                    if isinstance(cat, dict):
-                        cat_id = cat.get("id")
-                        cat_name = cat.get("name")
-                        if cat_id and cat_name:
-                            categories_dict[cat_id] = cat_name
-            else:
+            cat_list = _group_categories(group)
+            if not cat_list:
                 groups_without_category += 1
+            
+            for cat in cat_list:
+                cat_name = cat.get("name")
+                if cat_name:
+                    categories_dict[cat["id"]] = cat_name
         
         # Build categories list
         categories_list = [
@@ -208,140 +235,97 @@ async def get_group_categories(request: CategoriesRequest):
                 "name": "No Category"
             })
         
-        return {
+        tagged = await _cache_set(cache_key, _tagged({
             "categories": categories_list
-        }
+        }))
+        return _etag_response(tagged, http_request, response)
     except Exception as e:
-        import traceback
-        print(f"Error fetching group categories: {traceback.format_exc()}")
+        logger.error("Error fetching group categories: %s", traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/groups-and-services")
-async def get_groups_and_service_positions(request: GroupsAndServicesRequest):
+async def get_groups_and_service_positions(request: GroupsAndServicesRequest, http_request: Request, response: Response):
     """Get combined list of groups and volunteer positions (all groups, no filtering - done client-side)"""
-    return await _get_groups_and_service_positions_impl(request.api_key)
+    tagged = await _get_groups_and_service_positions_impl(request.api_key)
+    return _etag_response(tagged, http_request, response)
 
-def group_has_excluded_category(group: Dict, excluded_category_ids: List[str]) -> bool:
+def group_has_excluded_category(group: Dict, excluded_category_ids: Set[str]) -> bool:
     """Check if a group has any of the excluded categories"""
     if not excluded_category_ids:
         return False
     
-    # Handle "__no_category__" special case
-    if "__no_category__" in excluded_category_ids:
-        categories = group.get("categories")
-        if not categories:
-            return True  # Group has no category and we're excluding "no category"
-        # Check if categories is empty
-        if isinstance(categories, dict):
-            cat_list = categories.get("category", [])
-            if isinstance(cat_list, dict):
-                cat_list = [cat_list]
-            if not cat_list:
-                return True
-        elif isinstance(categories, list) and not categories:
-            return True
-    
-    # Check if group has any excluded category
-    categories = group.get("categories")
-    if not categories:
-        return False  # No categories, but we're not excluding "no category" here
-    
-    # Extract category IDs from group
-    if isinstance(categories, dict):
-        cat_list = categories.get("category", [])
-        if isinstance(cat_list, dict):
-            cat_list = [cat_list]
-    elif isinstance(categories, list):
-        cat_list = categories
-    else:
-        cat_list = []
+    cat_ids = _group_category_ids(group)
     
-    for cat in cat_list:
-        if isinstance(cat, dict):
-            cat_id = cat.get("id")
-            if cat_id and cat_id in excluded_category_ids:
-                return True
+    # Group has no category - only excluded when excluding "no category"
+    if not cat_ids:
+        return "__no_category__" in excluded_category_ids
     
-    return False
+    return not excluded_category_ids.isdisjoint(cat_ids)
 
-async def _get_groups_and_service_positions_impl(api_key: str):
-    """Internal implementation for getting groups and services (no filtering - done client-side)"""
+async def _get_groups_and_service_positions_impl(api_key: str) -> Tuple[Dict, Optional[str]]:
+    """
+    Internal implementation for getting groups and services (no filtering - done client-side).
+    Returns (payload, etag); partial results after a failed fetch aren't cached or tagged.
+    """
     try:
-        client = ElvantoClient(api_key=api_key)
+        cache_key = _cache_key("groups-and-services", api_key)
+        cached = await _cache_get(cache_key)
+        if cached is not None:
+            return cached
+        
+        # Partial results (a failed fetch) are returned but not cached
+        fetch_failed = False
         
-        # Get all groups with people AND categories
+        # Fetch groups (people + categories) and people concurrently - each is
+        # a blocking Elvanto round-trip, so overlap them in worker threads
+        with ElvantoClient(api_key=api_key) as client:
+            groups, people = await asyncio.gather(
+                asyncio.to_thread(client.get_all_groups),
+                # Demographics are kept so /filter can apply the adult check to this cached dataset
+                asyncio.to_thread(client.get_all_people_with_departments, False, include_demographics=True),
+                return_exceptions=True
+            )
+        
+        # Get all groups with people (for leaders) AND categories (for filtering)
         try:
-            # We need both people (for leaders) and categories (for filtering)
-            groups_with_people = client.get_all_groups_with_people()
-            groups_with_categories = client.get_all_groups_with_categories()
-            
-            # Create a lookup for categories by group ID
-            categories_by_group_id = {}
-            for group in groups_with_categories:
-                group_id = group.get("id")
-                if group_id:
-                    categories_by_group_id[group_id] = group.get("categories")
-            
-            # Merge categories into groups_with_people
-            for group in groups_with_people:
-                group_id = group.get("id")
-                if group_id in categories_by_group_id:
-                    group["categories"] = categories_by_group_id[group_id]
-            
-            groups = groups_with_people
-            print(f"Fetched {len(groups)} groups")
+            if isinstance(groups, Exception):
+                raise groups
+            logger.debug("Fetched %d groups", len(groups))
         except Exception as e:
-            print(f"Error fetching groups: {str(e)}")
+            logger.error("Error fetching groups: %s", e)
             groups = []
+            fetch_failed = True
         
         # Get volunteer positions from people's departments
         # No category filtering here - filtering happens when getting people
         positions = {}
         try:
-            people = client.get_all_people_with_departments(adults_only=False)
-            print(f"Fetched {len(people)} people with departments")
+            if isinstance(people, Exception):
+                raise people
+            logger.debug("Fetched %d people with departments", len(people))
             
-            positions = client.extract_volunteer_positions_from_people(people)
+            # Pure data processing, so the closed session doesn't matter
+            positions = await asyncio.to_thread(client.extract_volunteer_positions_from_people, people)
             if not isinstance(positions, dict):
                 positions = {}
-            print(f"Extracted {len(positions)} volunteer positions")
+            logger.debug("Extracted %d volunteer positions", len(positions))
         except Exception as e:
-            import traceback
-            print(f"Error fetching people/positions: {str(e)}")
-            print(traceback.format_exc())
+            logger.error("Error fetching people/positions: %s\n%s", e, traceback.format_exc())
             positions = {}
+            fetch_failed = True
         
         # Format groups for selection - count only leaders, include category info
-        group_list = []
+        # Groups and positions go straight into one list rather than being concatenated
+        combined = []
         for group in groups:
             if not group.get("id"):
                 continue
             
-            # Extract category IDs from group
-            category_ids = []
-            categories = group.get("categories")
-            if categories:
-                if isinstance(categories, dict):
-                    cat_list = categories.get("category", [])
-                    if isinstance(cat_list, dict):
-                        cat_list = [cat_list]
-                elif isinstance(categories, list):
-                    cat_list = categories
-                else:
-                    cat_list = []
-                
-                for cat in cat_list:
-                    if isinstance(cat, dict):
-                        cat_id = cat.get("id")
-                        if cat_id:
-                            category_ids.append(cat_id)
-            
             # If no categories, mark as "__no_category__"
-            if not category_ids:
-                category_ids = ["__no_category__"]
+            category_ids = _group_category_ids(group) or ["__no_category__"]
             
             leaders = get_leaders_from_group(group)
-            group_list.append({
+            combined.append({
                 "id": str(group.get("id", "")),
                 "name": group.get("name", "Unnamed Group"),
                 "type": "group",
@@ -349,8 +333,10 @@ async def _get_groups_and_service_positions_impl(api_key: str):
                 "category_ids": category_ids  # Include category info for client-side filtering
             })
         
+        groups_count = len(combined)
+        
         # Format volunteer positions for selection
-        position_list = [
+        combined.extend(
             {
                 "id": str(pos_data.get("id", "")),
                 "name": pos_data.get("name", "Unknown"),
@@ -359,53 +345,85 @@ async def _get_groups_and_service_positions_impl(api_key: str):
                 "member_count": len(pos_data.get("volunteers", []))
             }
             for pos_id, pos_data in positions.items()
-        ]
+        )
         
-        combined = group_list + position_list
-        return {
+        result = {
             "items": combined,
             "count": len(combined),
-            "groups_count": len(group_list),
-            "positions_count": len(position_list)
+            "groups_count": groups_count,
+            "positions_count": len(positions)
         }
+        if fetch_failed:
+            return result, None
+        
+        # Keep the raw payload too so /filter can reuse it instead of refetching
+        await _cache_set(_cache_key("dataset", api_key), {
+            "groups": groups,
+            "people": people,
+            "positions": positions
+        })
+        return await _cache_set(cache_key, _tagged(result))
     except Exception as e:
-        import traceback
-        error_detail = f"{str(e)}\n{traceback.format_exc()}"
-        print(f"Error in get_groups_and_services: {error_detail}")
+        logger.error("Error in get_groups_and_services: %s\n%s", e, traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/cache/invalidate")
+async def invalidate_cache(request: BaseRequest):
+    """Drop cached categories/groups for an API key so the next load refetches from Elvanto"""
+    key_hash = _api_key_hash(request.api_key)
+    async with _response_cache_lock:
+        stale_keys = [key for key in _response_cache.keys() if key[1] == key_hash]
+        for key in stale_keys:
+            _response_cache.pop(key, None)
+    # The client's cache is keyed by the same sha256 hash
+    ElvantoClient.invalidate_cache(key_hash)
+    return {"invalidated": len(stale_keys)}
+
 @router.post("/filter")
 async def filter_people(request: FilterRequest):
-    """Filter people based on selected groups and volunteer positions"""
+    """Filter people based on selected groups and volunteer positions, streamed as NDJSON"""
     try:
-        client = ElvantoClient(api_key=request.api_key)
         excluded_category_ids = request.excluded_category_ids
-        excluded_group_category_ids = request.excluded_group_category_ids or []
+        excluded_group_category_ids = request.excluded_group_category_ids
         
         filtered_people = {}
         
+        # Reuse the data /groups-and-services just loaded when it's still cached,
+        # otherwise fetch whatever the selection needs concurrently
+        position_index = None
+        dataset = await _cache_get(_cache_key("dataset", request.api_key))
+        if dataset is not None:
+            groups = dataset["groups"]
+            people = dataset["people"]
+            
+            # The position index only depends on the dataset, so share it between
+            # filters with different selections. It lives in the dataset entry so
+            # the two always expire together
+            if request.service_position_ids:
+                position_index = dataset.get("position_index")
+                if position_index is None:
+                    position_index = dataset.setdefault(
+                        "position_index", await asyncio.to_thread(build_position_index, people)
+                    )
+        else:
+            with ElvantoClient(api_key=request.api_key) as client:
+                groups, people = await asyncio.gather(
+                    asyncio.to_thread(client.get_all_groups) if request.group_ids else _empty_result(),
+                    asyncio.to_thread(
+                        client.get_all_people_with_departments, True, excluded_category_ids
+                    ) if request.service_position_ids else _empty_result(),
+                    return_exceptions=True
+                )
+        
         # Process groups - ONLY include leaders
         if request.group_ids:
             try:
-                # Get groups with both people and categories
-                groups_with_people = client.get_all_groups_with_people()
-                groups_with_categories = client.get_all_groups_with_categories()
-                
-                # Create a lookup for categories by group ID
-                categories_by_group_id = {}
-                for group in groups_with_categories:
-                    group_id = group.get("id")
-                    if group_id:
-                        categories_by_group_id[group_id] = group.get("categories")
-                
-                # Merge categories into groups_with_people
-                groups = []
-                for group in groups_with_people:
-                    group_id = group.get("id")
-                    if group_id in categories_by_group_id:
-                        group["categories"] = categories_by_group_id[group_id]
-                    groups.append(group)
+                # Groups come back with both people and categories
+                if isinstance(groups, Exception):
+                    raise groups
                 
+                # Walk groups in Elvanto's order so the result order doesn't
+                # depend on the (hash-ordered) group_ids set
                 for group in groups:
                     group_id = str(group.get("id", ""))
                     if group_id not in request.group_ids:
@@ -418,90 +436,74 @@ async def filter_people(request: FilterRequest):
                     group_name = group.get("name", "Unknown Group")
                     leaders = get_leaders_from_group(group)
                     
+                    # Each group is visited once, so a person can only repeat
+                    # here if the group lists them twice
+                    seen_leader_ids = set()
                     for person in leaders:
                         person_id = person.get("id")
-                        if not person_id:
+                        if not person_id or person_id in seen_leader_ids:
                             continue
+                        seen_leader_ids.add(person_id)
                         
                         if person_id not in filtered_people:
-                            filtered_people[person_id] = {
-                                "id": person_id,
-                                "firstname": person.get("firstname", ""),
-                                "preferred_name": person.get("preferred_name", ""),
-                                "lastname": person.get("lastname", ""),
-                                "email": person.get("email", ""),
-                                "groups": [],
-                                "service_positions": []
-                            }
+                            filtered_people[person_id] = PersonOut.from_person(person)
                         
-                        existing = next(
-                            (g for g in filtered_people[person_id]["groups"] if g["id"] == group_id),
-                            None
-                        )
-                        if not existing:
-                            filtered_people[person_id]["groups"].append({
-                                "id": group_id,
-                                "name": group_name,
-                                "role": "Leader"
-                            })
+                        filtered_people[person_id].groups.append({
+                            "id": group_id,
+                            "name": group_name,
+                            "role": "Leader"
+                        })
             except Exception as e:
-                print(f"Error processing groups: {str(e)}")
+                logger.error("Error processing groups: %s", e)
         
         # Process volunteer positions - from people's departments
         if request.service_position_ids:
             try:
-                people = client.get_all_people_with_departments(
-                    adults_only=True,
-                    excluded_category_ids=excluded_category_ids
+                if isinstance(people, Exception):
+                    raise people
+                if position_index is None:
+                    # One-off index for freshly fetched people, so only the requested positions
+                    position_index = await asyncio.to_thread(
+                        build_position_index, people, request.service_position_ids
+                    )
+                
+                # Merge the requested positions' entries back into Elvanto's order,
+                # so the result doesn't depend on the (hash-ordered) id set
+                matches = sorted(
+                    (
+                        entry
+                        for position_id in request.service_position_ids
+                        for entry in position_index.get(position_id, ())
+                    ),
+                    key=itemgetter(0, 1)
                 )
                 
-                for person in people:
-                    person_id = person.get("id")
-                    if not person_id:
+                for _, _, person, position_id, dept_name in matches:
+                    # Cached datasets hold everyone, so apply the exclusions here
+                    if not should_include_person(person, excluded_category_ids):
                         continue
                     
-                    person_positions = get_person_positions_from_departments(person)
-                    
-                    matched_positions = [
-                        pos for pos in person_positions 
-                        if pos["id"] in request.service_position_ids
-                    ]
+                    person_id = person["id"]
+                    if person_id not in filtered_people:
+                        filtered_people[person_id] = PersonOut.from_person(person)
                     
-                    if matched_positions:
-                        if person_id not in filtered_people:
-                            filtered_people[person_id] = {
-                                "id": person_id,
-                                "firstname": person.get("firstname", ""),
-                                "preferred_name": person.get("preferred_name", ""),
-                                "lastname": person.get("lastname", ""),
-                                "email": person.get("email", ""),
-                                "groups": [],
-                                "service_positions": []
-                            }
-                        
-                        for pos in matched_positions:
-                            existing = next(
-                                (p for p in filtered_people[person_id]["service_positions"] if p["id"] == pos["id"]),
-                                None
-                            )
-                            if not existing:
-                                filtered_people[person_id]["service_positions"].append({
-                                    "id": pos["id"],
-                                    "name": pos["name"],
-                                    "department": pos.get("department", "")
-                                })
+                    # The index lists each person once per position, so no dedup needed;
+                    # position ids are the sub-department display names
+                    filtered_people[person_id].service_positions.append({
+                        "id": position_id,
+                        "name": position_id,
+                        "department": dept_name
+                    })
             except Exception as e:
-                import traceback
-                print(f"Error processing volunteer positions: {str(e)}")
-                print(traceback.format_exc())
+                logger.error("Error processing volunteer positions: %s\n%s", e, traceback.format_exc())
         
-        result = list(filtered_people.values())
+        def stream_people():
+            for person_out in filtered_people.values():
+                yield orjson.dumps(person_out) + b"\n"
         
-        return {
-            "people": result,
-            "count": len(result)
-        }
+        # One JSON person per line, so the client can start reading before
+        # the whole result has been serialized
+        return StreamingResponse(stream_people(), media_type="application/x-ndjson")
     except Exception as e:
-        import traceback
-        print(f"Error in filter_people: {traceback.format_exc()}")
+        logger.error("Error in filter_people: %s", traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
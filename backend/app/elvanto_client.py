@@ -1,11 +1,142 @@
+import functools
+import hashlib
+import logging
 import os
+import threading
+import time
+from dataclasses import dataclass, field
+import orjson
 import requests
-from typing import Dict, List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
 from dotenv import load_dotenv
 
+try:
+    import ijson
+except ImportError:  # Optional - without it responses are parsed after they fully download
+    ijson = None
+
+try:
+    import brotli
+except ImportError:  # Optional - urllib3 only decodes br responses when it is installed
+    brotli = None
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Values Elvanto uses to flag a person as archived
+ARCHIVED_TRUTHY = frozenset({1, "1", True, "true", "True", "TRUE"})
+
+
+def as_list(value) -> List:
+    """
+    Normalize an Elvanto record-or-records value to a list: Elvanto returns a lone
+    record as a dict rather than a one-item list, and anything else that isn't a
+    list (missing, "" or other scalars) means there are none.
+    """
+    if isinstance(value, list):
+        return value
+    return [value] if isinstance(value, dict) else []
+
+
+def unwrap(parent: Dict, outer_key: str, inner_key: str) -> List:
+    """
+    Normalize Elvanto's {outer_key: {inner_key: item-or-list}} nesting to a list.
+    A bare list under outer_key is returned as-is, and anything else that isn't a
+    dict (missing, "" or other scalars) gives an empty list.
+    """
+    outer = parent.get(outer_key)
+    if isinstance(outer, list):
+        return outer
+    if not isinstance(outer, dict):
+        return []
+    return as_list(outer.get(inner_key))
+
+
+def is_adult(person: Dict) -> bool:
+    """
+    Check if a person should be included as an adult.
+    - Include if demographics has 'Adults'
+    - Include if no demographics are set (assume adult)
+    - Exclude only if explicitly marked as 'Children' (and not also 'Adults')
+    """
+    # Single pass: 'Adults' wins outright, otherwise exclude only 'Children'
+    is_child = False
+    for demographic in unwrap(person, "demographics", "demographic"):
+        name = demographic.get("name", "").lower()
+        if name == "adults":
+            return True
+        if name == "children":
+            is_child = True
+    
+    return not is_child
+
+
+def _is_eligible(person: Dict) -> bool:
+    """
+    The request-independent part of should_include_person (not archived, not a child).
+    Memoized on the person dict, since cached datasets are filtered repeatedly.
+    """
+    eligible = person.get("_eligible")
+    if eligible is None:
+        # Exclude archived people
+        if person.get("archived", 0) in ARCHIVED_TRUTHY:
+            eligible = False
+        else:
+            # Check demographics - exclude children
+            eligible = is_adult(person)
+        person["_eligible"] = eligible
+    return eligible
+
+
+def should_include_person(person: Dict, excluded_category_ids: Optional[Set[str]] = None) -> bool:
+    """
+    Check if a person should be included based on all criteria:
+    - Not archived
+    - Not in excluded categories
+    - Is an adult (see is_adult)
+    """
+    # Exclude people in excluded categories
+    if excluded_category_ids and person.get("category_id", "") in excluded_category_ids:
+        return False
+    
+    return _is_eligible(person)
+
+
+@dataclass(slots=True)
+class _PositionAccum:
+    """A position's rostered volunteers while they're being collected, before deduplication"""
+    id: str
+    name: str
+    department: str
+    position_ids: List[str] = field(default_factory=list)
+    volunteers: List[str] = field(default_factory=list)
+
+
 class ElvantoClient:
+    PAGE_SIZE = 100
+    # Concurrent page fetches per paginated call, kept low to stay within Elvanto's rate limits
+    MAX_PAGE_WORKERS = 5
+    # (connect, read) seconds: fail fast on a dead connection, but give heavy getAll pages time
+    TIMEOUT = (5, 60)
+    # Categories change on the order of days, so reuse them for a few minutes
+    CACHE_TTL = 300
+    # Read-only endpoints, safe to share one in-flight response between callers
+    IDEMPOTENT_ENDPOINT_SUFFIXES = ("/getAll", "/getInfo")
+    
+    # A client is created per API request, so the cache is shared across
+    # instances and keyed by a hash of the API key
+    _cache: Dict[Tuple[str, str], Tuple[float, Any]] = {}
+    _cache_lock = threading.Lock()
+    # Calls currently running, so identical concurrent calls (e.g. a double-clicked
+    # export) wait for the first one's result instead of repeating it
+    _inflight: Dict[Tuple, Future] = {}
+    _inflight_lock = threading.Lock()
+    
     def __init__(self, api_key: str = None):
         # Use provided API key or fall back to env (for backwards compatibility)
         self.api_key = api_key or os.getenv("ELVANTO_API_KEY")
@@ -13,21 +144,82 @@ class ElvantoClient:
             raise ValueError("Elvanto API key is required")
         self.api_url = os.getenv("ELVANTO_API_URL", "https://api.elvanto.com/v1")
         self.auth = (self.api_key, "x")
+        self._cache_owner = hashlib.sha256(self.api_key.encode()).hexdigest()
+        
+        # Reuse one connection pool across the paginated requests instead of
+        # paying a new TCP + TLS handshake on every call
+        self._session = requests.Session()
+        self._session.auth = self.auth
+        self._session.headers.update({
+            "Content-Type": "application/json",
+            "Accept-Encoding": "gzip, deflate, br" if brotli is not None else "gzip, deflate"
+        })
+        # Sized well above MAX_PAGE_WORKERS so concurrent page fetches never wait on the pool
+        api_origin = "{0.scheme}://{0.netloc}".format(urlsplit(self.api_url))
+        self._session.mount(api_origin, HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=32,
+            # Every endpoint used is read-only, so POSTs are safe to retry. Read timeouts
+            # get one retry since a slow page is likely to be slow again
+            max_retries=Retry(
+                total=3,
+                connect=3,
+                read=1,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(["POST"]),
+                raise_on_status=False
+            )
+        ))
+    
+    def close(self):
+        """Close the underlying HTTP session and its pooled connections"""
+        self._session.close()
+    
+    def __enter__(self) -> "ElvantoClient":
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def _singleflight(self, key: Tuple, fn: Callable[[], Any]) -> Any:
+        """Return fn()'s result, or if an identical call is already running for this API key, wait for its result"""
+        key = (self._cache_owner,) + key
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = self._inflight[key] = Future()
+        if not is_leader:
+            return future.result()
+        
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+        future.set_result(result)
+        return result
     
     def _make_request(self, endpoint: str, data: Optional[Dict] = None) -> Dict:
         """Make a POST request to the Elvanto API (per API documentation)"""
+        body = orjson.dumps(data or {}, option=orjson.OPT_SORT_KEYS)
+        if endpoint.endswith(self.IDEMPOTENT_ENDPOINT_SUFFIXES):
+            return self._singleflight(("request", endpoint, body), lambda: self._post(endpoint, body))
+        return self._post(endpoint, body)
+    
+    def _post(self, endpoint: str, body: bytes) -> Dict:
         url = f"{self.api_url}/{endpoint}.json"
         try:
             # Elvanto API uses POST with JSON body for all requests
-            response = requests.post(
-                url,
-                auth=self.auth,
-                json=data or {},
-                timeout=60,
-                headers={"Content-Type": "application/json"}
-            )
-            response.raise_for_status()
-            result = response.json()
+            response = self._session.post(url, data=body, timeout=self.TIMEOUT)
+            if not response.ok:
+                raise Exception(f"HTTP {response.status_code}: {response.text[:200]}")
+            # Parse the body bytes once, without requests' encoding detection
+            result = orjson.loads(response.content)
             
             # Check for Elvanto API errors
             if "status" in result and result.get("status") != "ok":
@@ -40,224 +232,231 @@ class ElvantoClient:
         except ValueError as e:
             raise Exception(f"Invalid JSON response: {str(e)}")
     
-    def _to_int(self, value, default=0):
-        """Convert value to int safely"""
+    def _stream_request(self, endpoint: str, data: Dict, item_path: str, meta: Dict) -> Iterator[Dict]:
+        """
+        Make a POST request to the Elvanto API and yield the records at item_path
+        (e.g. "people.person") while the response is still downloading.
+        Scalars outside the records (status, pagination totals) are collected into
+        `meta` keyed by their JSON path, so it is only complete once exhausted.
+        """
+        url = f"{self.api_url}/{endpoint}.json"
+        item_prefixes = (item_path, f"{item_path}.item")
         try:
-            return int(value)
-        except (ValueError, TypeError):
-            return default
-    
-    def get_all_groups_with_people(self) -> List[Dict]:
-        """Get all groups from Elvanto with people field included"""
-        all_groups = []
-        page = 1
-        page_size = 100
-        
-        while True:
-            result = self._make_request("groups/getAll", {
-                "page": page,
-                "page_size": page_size,
-                "fields": ["people"]
-            })
-            groups_data = result.get("groups", {})
-            
-            if not groups_data:
-                break
+            with self._session.post(url, data=orjson.dumps(data), stream=True, timeout=self.TIMEOUT) as response:
+                if not response.ok:
+                    raise Exception(f"HTTP {response.status_code}: {response.text[:200]}")
+                # Have urllib3 undo gzip/deflate before the bytes reach ijson
+                response.raw.decode_content = True
                 
-            groups = groups_data.get("group", [])
-            
-            if not groups:
-                break
-            
-            # Handle single group vs list
-            if isinstance(groups, dict):
-                groups = [groups]
-            
-            all_groups.extend(groups)
-            
-            # Check pagination - convert to int for comparison
-            total = self._to_int(groups_data.get("total", 0))
-            per_page = self._to_int(groups_data.get("per_page", page_size))
-            on_this_page = self._to_int(groups_data.get("on_this_page", len(groups)))
-            
-            # Stop if we got fewer than expected or we have all records
-            if on_this_page < per_page or len(all_groups) >= total:
-                break
-            page += 1
+                builder = None
+                builder_prefix = None
+                for prefix, event, value in ijson.parse(response.raw, use_float=True):
+                    if builder is not None:
+                        builder.event(event, value)
+                        if event == "end_map" and prefix == builder_prefix:
+                            yield builder.value
+                            builder = None
+                    elif event == "start_map" and prefix in item_prefixes:
+                        # A page holds either a single record or a list of them
+                        builder = ijson.ObjectBuilder()
+                        builder.event(event, value)
+                        builder_prefix = prefix
+                    elif event in ("string", "number", "boolean"):
+                        meta[prefix] = value
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"Request failed: {str(e)}")
+        except ijson.JSONError as e:
+            raise Exception(f"Invalid JSON response: {str(e)}")
         
-        return all_groups
+        # Check for Elvanto API errors
+        if meta.get("status", "ok") != "ok":
+            error_msg = meta.get("error.message", "Unknown Elvanto API error")
+            raise Exception(f"Elvanto API error: {error_msg}")
     
-    def get_all_groups_with_categories(self) -> List[Dict]:
-        """Get all groups from Elvanto with categories field included"""
-        all_groups = []
-        page = 1
-        page_size = 100
-        
-        while True:
-            result = self._make_request("groups/getAll", {
-                "page": page,
-                "page_size": page_size,
-                "fields": ["categories"]
-            })
-            groups_data = result.get("groups", {})
-            
-            if not groups_data:
-                break
-                
-            groups = groups_data.get("group", [])
-            
-            if not groups:
-                break
-            
-            # Handle single group vs list
-            if isinstance(groups, dict):
-                groups = [groups]
-            
-            all_groups.extend(groups)
-            
-            # Check pagination - convert to int for comparison
-            total = self._to_int(groups_data.get("total", 0))
-            per_page = self._to_int(groups_data.get("per_page", page_size))
-            on_this_page = self._to_int(groups_data.get("on_this_page", len(groups)))
-            
-            # Stop if we got fewer than expected or we have all records
-            if on_this_page < per_page or len(all_groups) >= total:
-                break
-            page += 1
+    def _cached(self, key: str, ttl: float, fn: Callable[[], Any]) -> Any:
+        """Return fn()'s result, reusing it for `ttl` seconds for this API key. Errors are not cached."""
+        cache_key = (self._cache_owner, key)
+        with self._cache_lock:
+            entry = self._cache.get(cache_key)
+        if entry is not None and time.monotonic() - entry[0] < ttl:
+            return entry[1]
         
-        return all_groups
+        result = self._singleflight(("cached", key), fn)
+        now = time.monotonic()
+        with self._cache_lock:
+            # Drop anything that has expired so other API keys' entries don't pile up
+            for stale_key in [k for k, (ts, _) in self._cache.items() if now - ts >= self.CACHE_TTL]:
+                del self._cache[stale_key]
+            self._cache[cache_key] = (now, result)
+        return result
     
-    def get_all_categories(self) -> List[Dict]:
-        """Get all people categories from Elvanto"""
-        try:
-            result = self._make_request("people/categories/getAll", {})
-            categories_data = result.get("categories", {})
-            categories = categories_data.get("category", [])
-            if isinstance(categories, dict):
-                categories = [categories]
-            return categories
-        except Exception as e:
-            print(f"Error fetching categories: {e}")
-            return []
+    @classmethod
+    def invalidate_cache(cls, cache_owner: str):
+        """Forget everything cached for the API key whose sha256 hex digest is cache_owner"""
+        with cls._cache_lock:
+            for key in [k for k in cls._cache if k[0] == cache_owner]:
+                del cls._cache[key]
     
-    def get_all_group_categories(self) -> List[Dict]:
-        """Get all group categories from Elvanto"""
+    def _to_int(self, value, default=0):
+        """Convert value to int safely"""
         try:
-            result = self._make_request("groups/categories/getAll", {})
-            categories_data = result.get("categories", {})
-            categories = categories_data.get("category", [])
-            if isinstance(categories, dict):
-                categories = [categories]
-            return categories
-        except Exception as e:
-            print(f"Error fetching group categories: {e}")
-            return []
+            return int(value)
+        except (ValueError, TypeError):
+            return default
     
-    def should_include_person(self, person: Dict, excluded_category_ids: List[str] = None) -> bool:
+    def _fetch_page(self, endpoint: str, collection_key: str, item_key: str, page: int, fields: List[str],
+                    item_filter: Optional[Callable[[Dict], bool]] = None) -> Tuple[Dict, List[Dict]]:
         """
-        Check if a person should be included based on all criteria:
-        - Not archived
-        - Not in excluded categories
-        - Is an adult (not marked as "Children")
+        Fetch one page of a getAll endpoint, returning its pagination info and items.
+        Items failing item_filter are dropped - with ijson available that happens as
+        the response streams in, so rejected records are never held as a page.
         """
-        if excluded_category_ids is None:
-            excluded_category_ids = []
+        request_data = {
+            "page": page,
+            "page_size": self.PAGE_SIZE,
+            "fields": fields
+        }
         
-        # Exclude archived people
-        archived = person.get("archived", 0)
-        if archived == 1 or archived == "1" or str(archived).lower() == "true":
-            return False
+        if ijson is not None:
+            meta = {}
+            records = self._stream_request(endpoint, request_data, f"{collection_key}.{item_key}", meta)
+            items = [item for item in records if item_filter is None or item_filter(item)]
+            prefix = f"{collection_key}."
+            page_data = {key[len(prefix):]: value for key, value in meta.items() if key.startswith(prefix)}
+            return page_data, items
         
-        # Exclude people in excluded categories
-        category_id = person.get("category_id", "")
-        if category_id in excluded_category_ids:
-            return False
+        result = self._make_request(endpoint, request_data)
+        page_data = result.get(collection_key, {})
+        if not page_data:
+            return {}, []
         
-        # Check demographics - exclude children
-        if not self._is_adult(person):
-            return False
+        items = page_data.get(item_key, [])
+        if not items:
+            return page_data, []
         
-        return True
+        # Handle single item vs list
+        if isinstance(items, dict):
+            items = [items]
+        
+        if item_filter is not None:
+            items = [item for item in items if item_filter(item)]
+        
+        return page_data, items
     
-    def _is_adult(self, person: Dict) -> bool:
+    def _fetch_all_pages(self, endpoint: str, collection_key: str, item_key: str, fields: List[str],
+                         item_filter: Optional[Callable[[Dict], bool]] = None) -> List[List[Dict]]:
         """
-        Check if a person should be included as an adult.
-        - Include if demographics has 'Adults'
-        - Include if no demographics are set (assume adult)
-        - Exclude only if explicitly marked as 'Children' (and not also 'Adults')
+        Fetch every page of a getAll endpoint, returned in page order.
+        Page 1 reports the total, so the remaining pages are fetched concurrently.
         """
-        demographics = person.get("demographics", {})
-        if not demographics or not isinstance(demographics, dict):
-            # No demographics set - assume they're an adult
-            return True
-        
-        demo_list = demographics.get("demographic", [])
-        if isinstance(demo_list, dict):
-            demo_list = [demo_list]
+        page_data, items = self._fetch_page(endpoint, collection_key, item_key, 1, fields, item_filter)
+        pages = [items]
         
-        if not demo_list:
-            # Empty demographics list - assume adult
-            return True
+        # Check pagination - convert to int for comparison. Page 1 may be empty
+        # after filtering, so go by the reported total rather than the items
+        total = self._to_int(page_data.get("total", 0))
+        per_page = self._to_int(page_data.get("per_page", self.PAGE_SIZE)) or self.PAGE_SIZE
+        n_pages = (total + per_page - 1) // per_page
+        # Unfiltered record count, to notice records vanishing mid-pagination
+        fetched = self._to_int(page_data.get("on_this_page"), per_page)
         
-        demo_names = [d.get("name", "").lower() for d in demo_list]
+        if n_pages > 1:
+            with ThreadPoolExecutor(max_workers=min(self.MAX_PAGE_WORKERS, n_pages - 1)) as executor:
+                for page_data, items in executor.map(
+                    lambda page: self._fetch_page(endpoint, collection_key, item_key, page, fields, item_filter),
+                    range(2, n_pages + 1)
+                ):
+                    pages.append(items)
+                    on_this_page = self._to_int(page_data.get("on_this_page"), per_page)
+                    fetched += on_this_page
+                    if on_this_page < per_page and fetched < total:
+                        # A short page before the end means the total shrank since page 1.
+                        # map() has already queued every page: cancel the ones not yet
+                        # started, the few already in flight still finish on exit
+                        logger.warning("%s returned %d of %d records, stopping early", endpoint, fetched, total)
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        break
         
-        # If explicitly marked as Adults, include
-        if "adults" in demo_names:
-            return True
+        return pages
+    
+    def get_all_groups(self, fields: Tuple[str, ...] = ("people", "categories")) -> List[Dict]:
+        """
+        Get all groups from Elvanto with the given fields included.
+        The result is cached per field set, so the export's separate group lookups
+        share one paginated fetch within the cache window.
+        """
+        fields = tuple(fields)
         
-        # If explicitly marked as Children (and not Adults), exclude
-        if "children" in demo_names:
-            return False
+        def fetch_groups():
+            all_groups = []
+            for groups in self._fetch_all_pages("groups/getAll", "groups", "group", list(fields)):
+                all_groups.extend(groups)
+            return all_groups
         
-        # Any other demographics (Families, Youth, etc.) - include
-        return True
+        return self._cached(f"groups/getAll:{','.join(fields)}", self.CACHE_TTL, fetch_groups)
+    
+    def get_all_groups_with_people(self) -> List[Dict]:
+        """Get all groups from Elvanto with people field included"""
+        return [{k: v for k, v in group.items() if k != "categories"} for group in self.get_all_groups()]
+    
+    def get_all_groups_with_categories(self) -> List[Dict]:
+        """Get all groups from Elvanto with categories field included"""
+        return [{k: v for k, v in group.items() if k != "people"} for group in self.get_all_groups()]
     
-    def get_all_people_with_departments(self, adults_only: bool = True, excluded_category_ids: List[str] = None) -> List[Dict]:
-        """Get all people from Elvanto with departments field to find all rostered volunteers"""
-        all_people = []
-        page = 1
-        page_size = 100
+    def _fetch_categories(self, endpoint: str) -> List[Dict]:
+        result = self._make_request(endpoint, {})
+        categories_data = result.get("categories", {})
+        categories = categories_data.get("category", [])
+        if isinstance(categories, dict):
+            categories = [categories]
+        return categories
+    
+    def get_all_categories(self) -> List[Dict]:
+        """Get all people categories from Elvanto. Errors are raised so callers don't mistake them for no categories"""
+        return self._cached(
+            "people/categories", self.CACHE_TTL,
+            lambda: self._fetch_categories("people/categories/getAll")
+        )
+    
+    def get_all_group_categories(self) -> List[Dict]:
+        """Get all group categories from Elvanto. Errors are raised so callers don't mistake them for no categories"""
+        return self._cached(
+            "groups/categories", self.CACHE_TTL,
+            lambda: self._fetch_categories("groups/categories/getAll")
+        )
+    
+    def should_include_person(self, person: Dict, excluded_category_ids: Optional[Set[str]] = None) -> bool:
+        """Kept for existing callers of the client method; see the module-level should_include_person"""
+        return should_include_person(person, excluded_category_ids)
+    
+    def get_all_people_with_departments(self, adults_only: bool = True, excluded_category_ids: List[str] = None,
+                                        include_demographics: Optional[bool] = None) -> List[Dict]:
+        """
+        Get all people from Elvanto with departments field to find all rostered volunteers.
+        Demographics are only requested when filtering to adults, unless include_demographics
+        asks for them (e.g. so the caller can apply the adult check itself later).
+        """
+        if include_demographics is None:
+            include_demographics = adults_only
+        fields = ["departments", "demographics"] if include_demographics else ["departments"]
         
-        while True:
-            request_data = {
-                "page": page,
-                "page_size": page_size,
-                "fields": ["departments", "demographics"]  # Include demographics to filter adults
-            }
-            if page == 1:
-                print(f"DEBUG: People with departments request (adults_only={adults_only})")
-            result = self._make_request("people/getAll", request_data)
-            people_data = result.get("people", {})
-            
-            if not people_data:
-                break
-                
-            people = people_data.get("person", [])
-            
-            if not people:
-                break
-            
-            # Handle single person vs list
-            if isinstance(people, dict):
-                people = [people]
-            
-            # Filter based on all criteria (archived, category, demographics)
-            if adults_only:
-                people = [p for p in people if self.should_include_person(p, excluded_category_ids)]
-            
-            all_people.extend(people)
-            
-            # Check pagination
-            total = self._to_int(people_data.get("total", 0))
-            per_page = self._to_int(people_data.get("per_page", page_size))
-            on_this_page = self._to_int(people_data.get("on_this_page", len(people)))
+        # Filter based on all criteria (archived, category, demographics) as each page is parsed
+        excluded = frozenset(excluded_category_ids or ()) if adults_only else None
+        include_person = functools.partial(should_include_person, excluded_category_ids=excluded) if adults_only else None
+        
+        def fetch_people():
+            all_people = []
+            logger.debug("People with departments request (adults_only=%s)", adults_only)
+            for people in self._fetch_all_pages("people/getAll", "people", "person", fields, include_person):
+                all_people.extend(people)
             
-            if on_this_page < per_page or len(all_people) >= total:
-                break
-            page += 1
+            logger.debug("Fetched %d adults with departments", len(all_people))
+            return all_people
         
-        print(f"DEBUG: Fetched {len(all_people)} adults with departments")
-        return all_people
+        # Pages are streamed rather than sent through _make_request, so share
+        # identical concurrent fetches here, keyed on the fields and the filter
+        filter_key = tuple(sorted(excluded)) if excluded is not None else None
+        return self._singleflight(("people/getAll", tuple(fields), filter_key), fetch_people)
     
     def get_person_details(self, person_id: str) -> Dict:
         """Get detailed information about a specific person"""
@@ -271,49 +470,24 @@ class ElvantoClient:
         Returns a dict of position_key -> {name, department, volunteers: [...]}
         """
         positions = {}
+        get_position = positions.get
         
         for person in people:
             person_id = person.get("id")
             if not person_id:
                 continue
             
-            depts = person.get("departments", {})
-            if not depts or not isinstance(depts, dict):
-                continue
-            
-            dept_list = depts.get("department", [])
-            if isinstance(dept_list, dict):
-                dept_list = [dept_list]
-            
-            for dept in dept_list:
+            for dept in unwrap(person, "departments", "department"):
                 dept_name = dept.get("name", "Unknown")
                 
-                # Get sub-departments
-                sub_depts = dept.get("sub_departments", {})
-                if not sub_depts or not isinstance(sub_depts, dict):
-                    continue
-                
-                sub_list = sub_depts.get("sub_department", [])
-                if isinstance(sub_list, dict):
-                    sub_list = [sub_list]
-                
-                for sub in sub_list:
+                for sub in unwrap(dept, "sub_departments", "sub_department"):
                     sub_name = sub.get("name", "")
                     
                     # Skip if no sub-department name
                     if not sub_name:
                         continue
                     
-                    # Get positions
-                    positions_data = sub.get("positions", {})
-                    if not positions_data or not isinstance(positions_data, dict):
-                        continue
-                    
-                    pos_list = positions_data.get("position", [])
-                    if isinstance(pos_list, dict):
-                        pos_list = [pos_list]
-                    
-                    for pos in pos_list:
+                    for pos in unwrap(sub, "positions", "position"):
                         pos_id = pos.get("id", "")
                         
                         # Use sub-department name as the position name
@@ -326,26 +500,30 @@ class ElvantoClient:
                         # Use sub-department name as key to group all positions in that sub-department
                         key = display_name
                         
-                        if key not in positions:
-                            positions[key] = {
-                                "id": key,
-                                "name": display_name,
-                                "department": dept_name,
-                                "position_ids": set(),
-                                "volunteers": set()
-                            }
+                        position = get_position(key)
+                        if position is None:
+                            position = positions[key] = _PositionAccum(key, display_name, dept_name)
                         
-                        positions[key]["position_ids"].add(str(pos_id))
-                        positions[key]["volunteers"].add(person_id)
+                        # Plain appends in the hot loop; deduplicated once below
+                        position.position_ids.append(str(pos_id))
+                        position.volunteers.append(person_id)
         
-        # Convert sets to lists for JSON serialization
-        for key in positions:
-            positions[key]["volunteers"] = list(positions[key]["volunteers"])
-            positions[key]["position_ids"] = list(positions[key]["position_ids"])
+        # Deduplicate in one pass per position, keeping first-seen order
+        positions = {
+            key: {
+                "id": position.id,
+                "name": position.name,
+                "department": position.department,
+                "position_ids": list(dict.fromkeys(position.position_ids)),
+                "volunteers": list(dict.fromkeys(position.volunteers))
+            }
+            for key, position in positions.items()
+        }
         
-        print(f"DEBUG: Found {len(positions)} unique volunteer positions")
-        total_volunteers = sum(len(p["volunteers"]) for p in positions.values())
-        print(f"DEBUG: Total rostered volunteers: {total_volunteers}")
+        logger.debug("Found %d unique volunteer positions", len(positions))
+        if logger.isEnabledFor(logging.DEBUG):
+            total_volunteers = sum(len(p["volunteers"]) for p in positions.values())
+            logger.debug("Total rostered volunteers: %d", total_volunteers)
         
         return positions
     
@@ -361,10 +539,8 @@ class ElvantoClient:
             positions_data = item.get("positions", item.get("position", []))
             if positions_data:
                 if isinstance(positions_data, dict):
-                    positions_data = positions_data.get("position", [])
-                if isinstance(positions_data, dict):
-                    positions_data = [positions_data]
-                for pos in positions_data:
+                    positions_data = positions_data.get("position")
+                for pos in as_list(positions_data):
                     self._add_position(positions, pos, f"{service_type_name} - {heading_name}")
         
         # If it's a position/role type, extract it
@@ -384,11 +560,9 @@ class ElvantoClient:
                 # Get volunteers assigned to this position
                 volunteers = item.get("volunteers", item.get("volunteer", []))
                 if isinstance(volunteers, dict):
-                    volunteers = volunteers.get("volunteer", [])
-                if isinstance(volunteers, dict):
-                    volunteers = [volunteers]
+                    volunteers = volunteers.get("volunteer")
                 
-                for vol in volunteers:
+                for vol in as_list(volunteers):
                     person = vol.get("person", vol)
                     person_id = person.get("id")
                     if person_id:
@@ -398,10 +572,8 @@ class ElvantoClient:
         sub_items = item.get("items", item.get("item", []))
         if sub_items:
             if isinstance(sub_items, dict):
-                sub_items = sub_items.get("item", [])
-            if isinstance(sub_items, dict):
-                sub_items = [sub_items]
-            for sub_item in sub_items:
+                sub_items = sub_items.get("item")
+            for sub_item in as_list(sub_items):
                 self._add_item_positions(positions, sub_item, service_type_name)
 
     def _add_position(self, positions: Dict, position: Dict, service_type_name: str):
@@ -1,10 +1,16 @@
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from typing import IO, Dict, List
+import orjson
 import os
-import io
+import tempfile
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, Alignment
+from openpyxl.utils import get_column_letter
 from .api import people
 
 app = FastAPI(title="Elvanto Export API")
@@ -27,6 +33,7 @@ app.add_middleware(
     allow_credentials=allow_credentials,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 # Include routers
@@ -44,66 +51,81 @@ async def health():
 async def api_health():
     return {"status": "healthy"}
 
+def _build_xlsx(people_list: List[Dict]) -> IO[bytes]:
+    """Write the export workbook to a spooled temp file, rewound and ready to stream"""
+    # Create workbook - write-only mode streams rows out instead of keeping a Cell per value
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Elvanto Export")
+    
+    # Headers
+    headers = ["First Name", "Preferred Name", "Last Name", "Email", "Groups", "Service Positions"]
+    
+    # Format the rows first, tracking column widths as we go: a write-only
+    # sheet writes its column widths before the first row
+    rows = []
+    max_widths = [len(h) for h in headers]
+    _get = dict.get
+    for person in people_list:
+        get = person.get
+        firstname = get("firstname", "")
+        preferred_name = get("preferred_name", "")
+        lastname = get("lastname", "")
+        email = get("email", "")
+        
+        # Format groups
+        groups = get("groups", [])
+        groups_str = "; ".join("%s (%s)" % (_get(g, "name", "Unknown"), _get(g, "role", "Member")) for g in groups)
+        
+        # Format service positions
+        service_positions = get("service_positions", [])
+        positions_str = "; ".join(_get(sp, "name", "Unknown") for sp in service_positions)
+        
+        row = (firstname, preferred_name, lastname, email, groups_str, positions_str)
+        for i, value in enumerate(row):
+            # str() because a null field arrives as None
+            width = len(str(value))
+            if width > max_widths[i]:
+                max_widths[i] = width
+        rows.append(row)
+    
+    # Auto-adjust column widths
+    for i, width in enumerate(max_widths):
+        ws.column_dimensions[get_column_letter(i + 1)].width = min(width + 2, 50)
+    
+    # Style headers
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = Font(bold=True)
+        cell.alignment = Alignment(horizontal="center")
+        header_cells.append(cell)
+    ws.append(header_cells)
+    
+    # Add data
+    for row in rows:
+        ws.append(row)
+    
+    # Save to a spooled temp file - kept in memory unless the export is large
+    output = tempfile.SpooledTemporaryFile(max_size=10 * 1024 * 1024)
+    wb.save(output)
+    output.seek(0)
+    return output
+
 @app.post("/api/export/xlsx")
 async def export_to_xlsx(request: Request):
     """Export filtered people data to XLSX"""
     try:
-        data = await request.json()
+        data = orjson.loads(await request.body())
         people_list = data.get("people", [])
         
-        # Create workbook
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Elvanto Export"
-        
-        # Headers
-        headers = ["First Name", "Preferred Name", "Last Name", "Email", "Groups", "Service Positions"]
-        ws.append(headers)
-        
-        # Style headers
-        for cell in ws[1]:
-            cell.font = Font(bold=True)
-            cell.alignment = Alignment(horizontal="center")
-        
-        # Add data
-        for person in people_list:
-            firstname = person.get("firstname", "")
-            preferred_name = person.get("preferred_name", "")
-            lastname = person.get("lastname", "")
-            email = person.get("email", "")
-            
-            # Format groups
-            groups = person.get("groups", [])
-            groups_str = "; ".join([f"{g.get('name', 'Unknown')} ({g.get('role', 'Member')})" for g in groups])
-            
-            # Format service positions
-            service_positions = person.get("service_positions", [])
-            positions_str = "; ".join([sp.get('name', 'Unknown') for sp in service_positions])
-            
-            ws.append([firstname, preferred_name, lastname, email, groups_str, positions_str])
-        
-        # Auto-adjust column widths
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # Save to bytes
-        output = io.BytesIO()
-        wb.save(output)
-        output.seek(0)
+        # openpyxl serialization is synchronous CPU work - keep it off the event loop
+        output = await run_in_threadpool(_build_xlsx, people_list)
         
         return StreamingResponse(
-            output,
+            iter(lambda: output.read(64 * 1024), b""),
             media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": "attachment; filename=elvanto_export.xlsx"}
+            headers={"Content-Disposition": "attachment; filename=elvanto_export.xlsx"},
+            background=BackgroundTask(output.close)
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
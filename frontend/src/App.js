@@ -7,6 +7,42 @@ import './App.css';
 // - https://elvantoexport.oneclickit.com.au (production with reverse proxy at /api)
 const API_URL = (process.env.REACT_APP_API_URL || 'http://localhost:9000').replace(/\/$/, '');
 
+// Responses the backend tagged with an ETag, keyed by path + request body. These
+// endpoints are POSTs, which browsers never cache, so revalidation is done by hand:
+// send the ETag back as If-None-Match and reuse the stored data on a 304.
+const etagCache = new Map();
+
+async function postWithETag(path, body) {
+  const requestBody = JSON.stringify(body);
+  const cacheKey = `${path}\n${requestBody}`;
+  const cached = etagCache.get(cacheKey);
+  
+  const headers = { 'Content-Type': 'application/json' };
+  if (cached) {
+    headers['If-None-Match'] = cached.etag;
+  }
+  
+  const response = await fetch(`${API_URL}${path}`, {
+    method: 'POST',
+    headers,
+    body: requestBody,
+  });
+  
+  if (response.status === 304 && cached) {
+    return cached.data;
+  }
+  if (!response.ok) {
+    throw new Error(`HTTP error! status: ${response.status}`);
+  }
+  
+  const data = await response.json();
+  const etag = response.headers.get('ETag');
+  if (etag) {
+    etagCache.set(cacheKey, { etag, data });
+  }
+  return data;
+}
+
 function App() {
   const [apiKey, setApiKey] = useState('');
   const [apiKeySubmitted, setApiKeySubmitted] = useState(false);
@@ -74,12 +110,7 @@ function App() {
   useEffect(() => {
     if (!apiKeySubmitted) return;
     
-    fetch(`${API_URL}/api/categories`, {
-      method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ api_key: apiKey }),
-    })
-      .then(response => response.json())
+    postWithETag('/api/categories', { api_key: apiKey })
       .then(data => {
         setCategories(data.categories || []);
         setPeopleCategoriesLoaded(true);
@@ -94,12 +125,7 @@ function App() {
   useEffect(() => {
     if (!apiKeySubmitted) return;
     
-    fetch(`${API_URL}/api/group-categories`, {
-      method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ api_key: apiKey }),
-    })
-      .then(response => response.json())
+    postWithETag('/api/group-categories', { api_key: apiKey })
       .then(data => {
         setGroupCategories(data.categories || []);
         setGroupCategoriesLoaded(true);
@@ -119,17 +145,10 @@ function App() {
       setError(null);
       
       try {
-        const response = await fetch(`${API_URL}/api/groups-and-services`, {
-          method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify({ api_key: apiKey, excluded_group_category_ids: [] }),
+        const data = await postWithETag('/api/groups-and-services', {
+          api_key: apiKey,
+          excluded_group_category_ids: [],
         });
-        
-        if (!response.ok) {
-          throw new Error(`HTTP error! status: ${response.status}`);
-        }
-        
-        const data = await response.json();
         setAllItems(data.items || []);  // Store all items
         setMessage(`Loaded ${data.count || 0} items`);
         setItemsLoaded(true);
@@ -277,8 +296,26 @@ function App() {
         throw new Error(errorData.detail || `HTTP error! status: ${response.status}`);
       }
 
-      const data = await response.json();
-      setFilteredPeople(data.people || []);
+      // Results stream back as NDJSON - one person per line
+      const people = [];
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        for (const line of lines) {
+          if (line.trim()) people.push(JSON.parse(line));
+        }
+        setProgress(`Filtering people... ${people.length} found so far`);
+      }
+      buffer += decoder.decode();
+      if (buffer.trim()) people.push(JSON.parse(buffer));
+
+      setFilteredPeople(people);
       setProgress('');
     } catch (error) {
       console.error('Error filtering people:', error);